@@ -160,11 +160,28 @@ class Game2048:
             "board_size": self.size,
         }
 
-    def set_board(self, board: List[List[int]], score: int = 0, moves: int = 0):
-        """Set a specific board configuration (for testing)"""
+    def set_board(
+        self,
+        board: List[List[int]],
+        score: int = 0,
+        moves: int = 0,
+        target_tile: Optional[int] = None,
+    ):
+        """Set a specific board configuration (for testing)
+
+        Args:
+            board: The tiles to place, row by row
+            score: Score to report for the seeded board
+            moves: Move count to report for the seeded board
+            target_tile: Optional new target tile, applied before the win check
+        """
+        if target_tile is not None:
+            self.target_tile = target_tile
         self.board = np.array(board, dtype=int)
         self.score = score
         self.moves_made = moves
+        self.won = False
+        self.game_over = False
         self.check_game_status()
 
     def reset(self, size: Optional[int] = None, target_tile: Optional[int] = None):
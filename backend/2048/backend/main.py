@@ -38,6 +38,7 @@ class SetBoardRequest(BaseModel):
     board: List[List[int]]
     score: Optional[int] = 0
     moves: Optional[int] = 0
+    target_tile: Optional[int] = None
 
 
 class SetTargetRequest(BaseModel):
@@ -188,9 +189,9 @@ def get_board():
 
 @app.post("/api/eval/set_board", response_model=GameState)
 def set_board(request: SetBoardRequest):
-    """Set a specific board configuration for testing"""
+    """Set a specific board configuration for testing, optionally with its target tile"""
     try:
-        game.set_board(request.board, request.score, request.moves)
+        game.set_board(request.board, request.score, request.moves, request.target_tile)
         return game.get_state()
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
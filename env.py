@@ -23,8 +23,8 @@ import math
 import os
 import pwd
 import shutil
-import socket
 import sys
+from collections.abc import Awaitable
 
 import httpx
 
@@ -59,28 +59,61 @@ _APP_TODO_API = "http://localhost:3004"
 
 _BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend")
 _DESKTOP_USER = "ubuntu"
-_http = httpx.AsyncClient(timeout=60.0)
+# One pooled client for every seed/grade call, so keep-alive sockets to the app backends are reused
+# across tasks instead of reconnecting per request; closed in @env.shutdown.
+# A short connect timeout fails fast on a dead backend; the read budget stays generous. The pool is
+# sized well past need — an env runs one task at a time. (No HTTP/2: uvicorn serves HTTP/1.1 only.)
+_http = httpx.AsyncClient(
+    timeout=httpx.Timeout(60.0, connect=5.0),
+    limits=httpx.Limits(max_connections=100, max_keepalive_connections=50, keepalive_expiry=60.0),
+    headers={"User-Agent": "HUD-Browser/1.0"},
+)
 _procs: "list[asyncio.subprocess.Process]" = []
+# The env's own Playwright driver + CDP attach to the shared browser, opened once and reused by every
+# task's pre-navigation (see _browser); detached in @env.shutdown.
+_pw = None
+_cdp_browser = None
+_cdp_lock = asyncio.Lock()
 
 
 # ── substrate lifecycle ──────────────────────────────────────────────────────
-def _port_open(host: str, port: int) -> bool:
-    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
-        sock.settimeout(0.5)
-        return sock.connect_ex((host, port)) == 0
+async def _port_open(host: str, port: int) -> bool:
+    """One non-blocking connect probe — the event loop keeps running while a port is down."""
+    try:
+        _, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout=0.5)
+    except (OSError, asyncio.TimeoutError):
+        return False
+    writer.close()
+    return True
 
 
 async def _listening(host: str, port: int, what: str, timeout: float = 60.0) -> None:
-    """Block until host:port accepts a connection."""
+    """Block until host:port accepts a connection. Polls fast at first (most ports are up within
+    a few hundred ms) and backs off to at most 0.5s for the slow starters (the Next.js servers)."""
     loop = asyncio.get_running_loop()
     deadline = loop.time() + timeout
+    delay = 0.05
     while loop.time() < deadline:
-        if _port_open(host, port):
+        if await _port_open(host, port):
             return
-        await asyncio.sleep(0.3)
+        await asyncio.sleep(delay)
+        delay = min(delay * 1.5, 0.5)
     raise RuntimeError(f"{what} never came up on {host}:{port}")
 
 
+async def _display_up(display: int, timeout: float = 5.0) -> None:
+    """Wait for Xvfb to create the display's socket instead of sleeping a fixed interval. Best-effort:
+    on timeout the clients are started anyway, exactly as after the old blind sleep."""
+    path = f"/tmp/.X11-unix/X{display}"
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not os.path.exists(path):
+        if loop.time() >= deadline:
+            logger.warning("X display :%d socket not seen after %.0fs; continuing", display, timeout)
+            return
+        await asyncio.sleep(0.05)
+
+
 def _drop_to_ubuntu() -> bool:
     """Run the substrate as the unprivileged ``ubuntu`` user when we can (root in the image and the
     user exists). Locally on a non-root dev box we run as ourselves."""
@@ -126,7 +159,7 @@ async def _start_substrate() -> None:
     port is up. ``python3 -m uvicorn`` puts the backend's cwd on sys.path, so ``main`` / ``game``
     import with no PYTHONPATH; the Next.js frontends are served from their pre-built ``.next``."""
     _procs.append(await _spawn("Xvfb", ":1", "-screen", "0", "1280x800x24"))
-    await asyncio.sleep(0.8)  # let the X server come up before clients attach
+    await _display_up(1)  # let the X server come up before clients attach
     _procs.append(
         await _spawn("x11vnc", "-display", ":1", "-rfbport", str(_VNC_PORT),
                      "-forever", "-shared", "-nopw", "-localhost")
@@ -151,40 +184,71 @@ async def _start_substrate() -> None:
             await _spawn("npm", "run", "start", "--", "--port", str(fe), "--hostname", "0.0.0.0",
                          cwd=os.path.join(app, "frontend"), quiet=False)
         )
-    await _listening(_HOST, _VNC_PORT, "x11vnc")
-    await _listening(_HOST, _CDP_PORT, "BrowserOS CDP")
-    for name, fe, be in _APPS:
-        await _listening(_HOST, be, f"{name} backend")
-        await _listening(_HOST, fe, f"{name} frontend")
+    # Everything boots in parallel, so wait on every port at once: startup costs the slowest one.
+    await asyncio.gather(
+        _listening(_HOST, _VNC_PORT, "x11vnc"),
+        _listening(_HOST, _CDP_PORT, "BrowserOS CDP"),
+        *[_listening(_HOST, be, f"{name} backend") for name, _, be in _APPS],
+        *[_listening(_HOST, fe, f"{name} frontend") for name, fe, _ in _APPS],
+    )
+
+
+async def _browser():
+    """The env's CDP connection to the shared browser. Starting the Playwright driver and attaching
+    is the slow part of a pre-navigation, so it is done once (warmed in ``@env.initialize``) and
+    redone only if the connection has dropped."""
+    global _pw, _cdp_browser
+    async with _cdp_lock:
+        if _cdp_browser is None or not _cdp_browser.is_connected():
+            if _pw is None:
+                from playwright.async_api import async_playwright
 
+                _pw = await async_playwright().start()
+            _cdp_browser = await _pw.chromium.connect_over_cdp(f"http://{_HOST}:{_CDP_PORT}")
+        return _cdp_browser
 
-async def _navigate(url: str) -> None:
+
+async def _navigate(url: str, after: "asyncio.Event | None" = None) -> None:
     """Point the shared browser at ``url`` (env-side) so the agent starts on the app. Best-effort:
-    the prompt also names the URL, so if this fails the agent simply navigates there itself."""
+    the prompt also names the URL, so if this fails the agent simply navigates there itself.
+    ``after`` holds the page load (not the CDP attach) until it is set."""
     try:
-        from playwright.async_api import async_playwright
-
-        async with async_playwright() as p:
-            browser = await p.chromium.connect_over_cdp(f"http://{_HOST}:{_CDP_PORT}")
-            try:
-                ctx = browser.contexts[0] if browser.contexts else await browser.new_context()
-                page = ctx.pages[0] if ctx.pages else await ctx.new_page()
-                await page.goto(url, wait_until="domcontentloaded", timeout=20000)
-            finally:
-                await browser.close()  # detaches; the external BrowserOS keeps running
+        browser = await _browser()
+        ctx = browser.contexts[0] if browser.contexts else await browser.new_context()
+        page = ctx.pages[0] if ctx.pages else await ctx.new_page()
+        if after is not None:
+            await after.wait()
+        await page.goto(url, wait_until="domcontentloaded", timeout=20000)
     except Exception as e:
         logger.warning("pre-navigation to %s failed (agent will navigate): %s", url, e)
 
 
+async def _seed_and_navigate(seed: "Awaitable[httpx.Response]", url: str) -> None:
+    """Run a task's seed request while the browser attaches over CDP, then load ``url``. The page
+    load waits for the seed: the frontends read their state once on mount, so loading first would
+    show the agent the previous task's board."""
+    seeded = asyncio.Event()
+    nav = asyncio.create_task(_navigate(url, after=seeded))
+    try:
+        await seed
+    finally:
+        seeded.set()
+        await nav
+
+
 @env.initialize
 async def _up() -> None:
     """Launch the substrate (idempotent — skip if a desktop already serves) and publish both browser
     capabilities. The desktop + apps boot in a few seconds, well under the startup probe."""
-    if not _port_open(_HOST, _VNC_PORT):
+    if not await _port_open(_HOST, _VNC_PORT):
         logger.info("launching browser substrate")
         await _start_substrate()
     else:
         await _listening(_HOST, _VNC_PORT, "x11vnc")
+    try:
+        await _browser()  # warm the CDP attach so the first task's pre-navigation doesn't pay it
+    except Exception as e:
+        logger.warning("could not attach to the browser over CDP yet (retried per task): %s", e)
     # Publish the SAME browser two ways: rfb (display 0 -> VNC 5900) + cdp (DevTools on 9222).
     env.add_capability(Capability.rfb(name="screen", url=f"rfb://{_HOST}", display=0))
     env.add_capability(Capability.cdp(name="browser", url=f"http://{_HOST}:{_CDP_PORT}"))
@@ -192,7 +256,16 @@ async def _up() -> None:
 
 @env.shutdown
 async def _down() -> None:
+    global _pw, _cdp_browser
     logger.info("browser env shutting down")
+    try:
+        if _cdp_browser is not None:
+            await _cdp_browser.close()  # detaches; the external BrowserOS keeps running
+        if _pw is not None:
+            await _pw.stop()
+    except Exception as e:
+        logger.warning("closing the CDP connection failed: %s", e)
+    _pw = _cdp_browser = None
     for proc in reversed(_procs):
         try:
             proc.terminate()
@@ -203,27 +276,42 @@ async def _down() -> None:
 
 
 # ── 2048 game tasks ──────────────────────────────────────────────────────────
+# Tiles are powers of two, so their exponents come from a table; anything else falls back to log2.
+_LOG2 = {2**i: i for i in range(1, 18)}
+
+
+def _log2(n: int) -> float:
+    return _LOG2[n] if n in _LOG2 else math.log2(n)
+
+
+# Each prompt is a fixed instruction block with the task's parameter appended last, so every
+# instance of a template shares the same prompt prefix (and the provider's prompt cache with it).
+_REACH_TILE_PROMPT = (
+    "Play the 2048 game in the browser and reach the target tile.\n\n"
+    f"The game is open at {_APP_2048_URL}. Move the tiles with the arrow keys "
+    "(up / down / left / right); two tiles with the same number merge into one. Keep your "
+    "highest tile in a corner and keep going until you reach the target or no moves remain.\n\n"
+    "Target tile: "
+)
+
+
 @env.template(id="2048-reach-tile")
 async def reach_tile(target: int = 512, board_size: int = 4):
     """Play 2048 toward a target tile — logarithmic partial credit."""
-    await _http.post(
-        f"{_APP_2048_API}/api/game/new", json={"board_size": board_size, "target_tile": target}
+    await _seed_and_navigate(
+        _http.post(
+            f"{_APP_2048_API}/api/game/new", json={"board_size": board_size, "target_tile": target}
+        ),
+        _APP_2048_URL,
     )
-    await _navigate(_APP_2048_URL)
-    prompt = (
-        f"Play the 2048 game in the browser and reach the {target} tile.\n\n"
-        f"The game is open at {_APP_2048_URL}. Move the tiles with the arrow keys "
-        f"(up / down / left / right); two tiles with the same number merge into one. Keep your "
-        f"highest tile in a corner and keep going until you reach {target} or no moves remain."
-    )
-    _ = yield prompt
+    _ = yield _REACH_TILE_PROMPT + str(target)
     try:
         state = (await _http.get(f"{_APP_2048_API}/api/game/state")).json()
         highest, score = state.get("highest_tile", 0), state.get("score", 0)
         if score == 0 or highest <= 1 or target <= 1:
             reward = 0.0
         else:
-            reward = min(1.0, math.log(highest) / math.log(target))
+            reward = min(1.0, _log2(highest) / _log2(target))
         logger.info("2048-reach-tile: highest=%d target=%d reward=%.2f", highest, target, reward)
         yield reward
     except Exception as e:
@@ -231,33 +319,51 @@ async def reach_tile(target: int = 512, board_size: int = 4):
         yield 0.0
 
 
+# Fixed near-win boards (two half-target tiles side by side) with their seeded score, by target.
+_NEAR_WIN_2048 = ((1024, 1024, 256, 128), (512, 256, 64, 32), (128, 64, 16, 8), (32, 16, 4, 2))
+_NEAR_WIN_1024 = ((512, 512, 128, 64), (256, 128, 32, 16), (64, 32, 8, 4), (16, 8, 2, 0))
+_NEAR_WIN_BOARDS = {
+    2048: (_NEAR_WIN_2048, sum(sum(row) for row in _NEAR_WIN_2048) * 2),
+    1024: (_NEAR_WIN_1024, sum(sum(row) for row in _NEAR_WIN_1024) * 2),
+}
+
+_NEAR_WIN_PROMPT = (
+    "You are one move away from winning! Reach the target tile.\n\n"
+    f"The game is open at {_APP_2048_URL} with two tiles of half the target ready to merge. "
+    "Make the winning move with the arrow keys.\n\n"
+    "Target tile: "
+)
+
+
 @env.template(id="2048-near-win")
 async def near_win(target: int = 2048):
     """Start one merge away from the target and finish the game — binary reward."""
     target = int(target)
-    if target == 2048:
-        board = [[1024, 1024, 256, 128], [512, 256, 64, 32], [128, 64, 16, 8], [32, 16, 4, 2]]
-    elif target == 1024:
-        board = [[512, 512, 128, 64], [256, 128, 32, 16], [64, 32, 8, 4], [16, 8, 2, 0]]
+    if target in _NEAR_WIN_BOARDS:
+        board, score = _NEAR_WIN_BOARDS[target]
     else:
         half, quarter = target // 2, target // 4
-        board = [
-            [half, half, quarter, quarter // 2],
-            [quarter, quarter // 2, 16, 8],
-            [16, 8, 4, 2],
-            [4, 2, 0, 0],
-        ]
-    await _http.post(
-        f"{_APP_2048_API}/api/eval/set_board",
-        json={"board": board, "score": sum(sum(row) for row in board) * 2, "moves": 150},
-    )
-    await _navigate(_APP_2048_URL)
-    prompt = (
-        f"You are one move away from winning! Reach the {target} tile.\n\n"
-        f"The game is open at {_APP_2048_URL} with two {target // 2} tiles ready to merge. "
-        f"Make the winning move with the arrow keys."
+        board = (
+            (half, half, quarter, quarter // 2),
+            (quarter, quarter // 2, 16, 8),
+            (16, 8, 4, 2),
+            (4, 2, 0, 0),
+        )
+        score = sum(sum(row) for row in board) * 2
+    await _seed_and_navigate(
+        _http.post(
+            f"{_APP_2048_API}/api/eval/set_board",
+            json={
+                "board": board,
+                "score": score,
+                "moves": 150,
+                # same request, so a previous game's target / won flag never leaks in
+                "target_tile": target,
+            },
+        ),
+        _APP_2048_URL,
     )
-    _ = yield prompt
+    _ = yield _NEAR_WIN_PROMPT + f"{target} (merge the two {target // 2} tiles)"
     try:
         state = (await _http.get(f"{_APP_2048_API}/api/game/state")).json()
         won = state.get("won", False) or state.get("highest_tile", 0) >= target
@@ -267,17 +373,19 @@ async def near_win(target: int = 2048):
         yield 0.0
 
 
+_REACH_SCORE_PROMPT = (
+    "Play 2048 and reach the target score.\n\n"
+    f"The game is open at {_APP_2048_URL}. Move with the arrow keys and merge tiles "
+    "efficiently to raise your score as high as you can.\n\n"
+    "Target score: "
+)
+
+
 @env.template(id="2048-score")
 async def reach_score(target_score: int = 5000):
     """Play 2048 toward a target score — linear partial credit."""
-    await _http.post(f"{_APP_2048_API}/api/game/new", json={})
-    await _navigate(_APP_2048_URL)
-    prompt = (
-        f"Play 2048 and reach a score of {target_score}.\n\n"
-        f"The game is open at {_APP_2048_URL}. Move with the arrow keys and merge tiles "
-        f"efficiently to raise your score as high as you can."
-    )
-    _ = yield prompt
+    await _seed_and_navigate(_http.post(f"{_APP_2048_API}/api/game/new", json={}), _APP_2048_URL)
+    _ = yield _REACH_SCORE_PROMPT + str(target_score)
     try:
         state = (await _http.get(f"{_APP_2048_API}/api/game/state")).json()
         score = state.get("score", 0)
@@ -288,19 +396,22 @@ async def reach_score(target_score: int = 5000):
 
 
 # ── todo app tasks ───────────────────────────────────────────────────────────
+_COMPLETE_TODOS_PROMPT = (
+    "Mark todo items as complete.\n\n"
+    f"The todo app is open at {_APP_TODO_URL}. Click a todo's checkbox to complete it; "
+    "keep going until the requested number of items are done.\n\n"
+    "Items to complete: "
+)
+
+
 @env.template(id="todo-complete")
 async def complete_todos(expected_count: int = 3):
     """Mark a number of seeded todos complete — count-based partial credit."""
-    await _http.post(f"{_APP_TODO_API}/api/eval/seed")
-    await _navigate(_APP_TODO_URL)
-    prompt = (
-        f"Mark {expected_count} todo items as complete.\n\n"
-        f"The todo app is open at {_APP_TODO_URL}. Click a todo's checkbox to complete it; "
-        f"keep going until {expected_count} items are done."
-    )
-    _ = yield prompt
+    await _seed_and_navigate(_http.post(f"{_APP_TODO_API}/api/eval/seed"), _APP_TODO_URL)
+    _ = yield _COMPLETE_TODOS_PROMPT + str(expected_count)
     try:
-        stats = (await _http.get(f"{_APP_TODO_API}/api/eval/stats")).json()
+        # just the counts — /api/eval/stats would also serialise every item and timestamp
+        stats = (await _http.get(f"{_APP_TODO_API}/api/eval/completion_rate")).json()
         completed = stats.get("completed_items", 0)
         if completed >= expected_count:
             reward = 1.0
@@ -316,17 +427,19 @@ async def complete_todos(expected_count: int = 3):
         yield 0.0
 
 
+_CREATE_TODO_PROMPT = (
+    "Create a new todo item with the title given below.\n\n"
+    f"The todo app is open at {_APP_TODO_URL}. Type the title into the new-todo input and "
+    "submit it. The title must match exactly.\n\n"
+    "Title: "
+)
+
+
 @env.template(id="todo-create")
 async def create_todo(title: str):
     """Create a new todo with an exact title — binary reward."""
-    await _http.delete(f"{_APP_TODO_API}/api/eval/reset")
-    await _navigate(_APP_TODO_URL)
-    prompt = (
-        f'Create a new todo item with the title: "{title}"\n\n'
-        f"The todo app is open at {_APP_TODO_URL}. Type the title into the new-todo input and "
-        f"submit it. The title must be exactly: {title}"
-    )
-    _ = yield prompt
+    await _seed_and_navigate(_http.delete(f"{_APP_TODO_API}/api/eval/reset"), _APP_TODO_URL)
+    _ = yield _CREATE_TODO_PROMPT + title
     try:
         todos = (await _http.get(f"{_APP_TODO_API}/api/eval/todos")).json()
         exists = any(todo.get("title") == title for todo in todos)
@@ -336,20 +449,21 @@ async def create_todo(title: str):
         yield 0.0
 
 
+_COMPLETION_RATE_PROMPT = (
+    "Complete a share of the todo items.\n\n"
+    f"The todo app is open at {_APP_TODO_URL}. Mark enough items done to reach the target "
+    "completion of the list.\n\n"
+    "Target completion: at least "
+)
+
+
 @env.template(id="todo-completion-rate")
 async def completion_rate(target_rate: float = 0.5):
     """Complete a fraction of the seeded todos — ratio-based partial credit."""
-    await _http.post(f"{_APP_TODO_API}/api/eval/seed")
-    await _navigate(_APP_TODO_URL)
-    pct = int(target_rate * 100)
-    prompt = (
-        f"Complete at least {pct}% of the todo items.\n\n"
-        f"The todo app is open at {_APP_TODO_URL}. Mark enough items done to reach {pct}% "
-        f"completion of the list."
-    )
-    _ = yield prompt
+    await _seed_and_navigate(_http.post(f"{_APP_TODO_API}/api/eval/seed"), _APP_TODO_URL)
+    _ = yield _COMPLETION_RATE_PROMPT + f"{int(target_rate * 100)}%"
     try:
-        stats = (await _http.get(f"{_APP_TODO_API}/api/eval/stats")).json()
+        stats = (await _http.get(f"{_APP_TODO_API}/api/eval/completion_rate")).json()
         total, completed = stats.get("total_items", 0), stats.get("completed_items", 0)
         actual = completed / total if total > 0 else 0.0
         yield min(1.0, actual / target_rate) if target_rate > 0 else 1.0
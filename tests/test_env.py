@@ -1,9 +1,14 @@
-"""Offline tests for the browser env templates — grading logic only, no browser or substrate.
+"""Offline tests for the browser env templates and their setup — no browser or substrate.
 
-Each test drives an `@env.template` generator with a fake HTTP client that returns canned app state,
-so the reward math is exercised without Docker. The real browser rollout is verified separately.
+The grading tests drive an `@env.template` generator with a fake HTTP client that returns canned app
+state, so the reward math is exercised without Docker. The setup tests use fakes to check that the
+page loads only after the seed lands and that the env's CDP connection is reused across tasks. The
+real browser rollout is verified separately.
 """
 
+import asyncio
+import math
+
 import pytest
 
 import env as M
@@ -66,7 +71,15 @@ async def test_2048_reach_tile_partial(monkeypatch):
         monkeypatch, M.reach_tile,
         {"/api/game/state": {"highest_tile": 64, "score": 600}}, target=512,
     )
-    assert 0.0 < reward < 1.0
+    assert reward == pytest.approx(6 / 9)
+
+
+async def test_2048_reach_tile_non_power_of_two_target(monkeypatch):
+    reward = await _grade(
+        monkeypatch, M.reach_tile,
+        {"/api/game/state": {"highest_tile": 64, "score": 600}}, target=300,
+    )
+    assert reward == pytest.approx(math.log(64) / math.log(300))
 
 
 async def test_2048_reach_tile_zero_score(monkeypatch):
@@ -96,11 +109,13 @@ async def test_2048_score(monkeypatch):
 
 async def test_todo_complete(monkeypatch):
     full = await _grade(
-        monkeypatch, M.complete_todos, {"/api/eval/stats": {"completed_items": 3}}, expected_count=3,
+        monkeypatch, M.complete_todos,
+        {"/api/eval/completion_rate": {"completed_items": 3}}, expected_count=3,
     )
     assert full == 1.0
     half = await _grade(
-        monkeypatch, M.complete_todos, {"/api/eval/stats": {"completed_items": 1}}, expected_count=2,
+        monkeypatch, M.complete_todos,
+        {"/api/eval/completion_rate": {"completed_items": 1}}, expected_count=2,
     )
     assert half == pytest.approx(0.5)
 
@@ -120,6 +135,57 @@ async def test_todo_create(monkeypatch):
 async def test_todo_completion_rate(monkeypatch):
     reward = await _grade(
         monkeypatch, M.completion_rate,
-        {"/api/eval/stats": {"total_items": 4, "completed_items": 2}}, target_rate=0.5,
+        {"/api/eval/completion_rate": {"total_items": 4, "completed_items": 2}}, target_rate=0.5,
     )
     assert reward == pytest.approx(1.0)
+
+
+async def test_page_loads_after_seed(monkeypatch):
+    order = []
+
+    async def _nav(url, after=None):
+        order.append("attach")
+        await after.wait()
+        order.append("goto")
+
+    async def _seed():
+        await asyncio.sleep(0)
+        order.append("seed")
+
+    monkeypatch.setattr(M, "_navigate", _nav)
+    await M._seed_and_navigate(_seed(), M._APP_2048_URL)
+    assert order == ["attach", "seed", "goto"]
+
+
+async def test_prompt_prefix_is_shared(monkeypatch):
+    monkeypatch.setattr(M, "_http", _FakeHTTP({}))
+    p256 = await M.reach_tile.func(target=256).asend(None)
+    p512 = await M.reach_tile.func(target=512).asend(None)
+    assert p256.startswith(M._REACH_TILE_PROMPT) and p512.startswith(M._REACH_TILE_PROMPT)
+    assert p256.endswith("256") and p512.endswith("512")
+
+
+async def test_cdp_attach_is_reused(monkeypatch):
+    attaches = []
+
+    class _Browser:
+        connected = True
+
+        def is_connected(self):
+            return self.connected
+
+    class _Chromium:
+        async def connect_over_cdp(self, url):
+            attaches.append(url)
+            return _Browser()
+
+    class _PW:
+        chromium = _Chromium()
+
+    monkeypatch.setattr(M, "_pw", _PW())
+    monkeypatch.setattr(M, "_cdp_browser", None)
+    first = await M._browser()
+    assert await M._browser() is first
+    first.connected = False  # a dropped connection is re-attached
+    assert await M._browser() is not first
+    assert len(attaches) == 2
@@ -49,6 +49,23 @@ class TestEvalEndpoints:
         assert state["board"] == board
         assert state["score"] == 500
 
+    def test_set_board_with_target_starts_unwon(self, game2048_client):
+        game2048_client.post("/api/game/set_target", json={"target_tile": 64})
+        game2048_client.post(
+            "/api/eval/set_board",
+            json={"board": [[128, 0, 0, 0], [0, 0, 0, 0], [0, 0, 0, 0], [0, 0, 0, 0]]},
+        )
+        assert game2048_client.get("/api/game/state").json()["won"] is True
+        resp = game2048_client.post(
+            "/api/eval/set_board",
+            json={
+                "board": [[512, 512, 0, 0], [0, 0, 0, 0], [0, 0, 0, 0], [0, 0, 0, 0]],
+                "target_tile": 1024,
+            },
+        )
+        assert resp.json()["target_tile"] == 1024
+        assert resp.json()["won"] is False
+
     def test_seed_produces_known_board(self, game2048_client):
         resp = game2048_client.post("/api/eval/seed")
         assert resp.json()["highest_tile"] == 1024